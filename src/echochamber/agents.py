@@ -1,4 +1,6 @@
+import numpy as np
 from mesa import Agent
+from kernels import direct_strengths, neighbor_similarity, update_connections
 
 # type = 0 : user, 1 : AI agent
 # AI subtype = 0 : social bot, 1 : recommendation algorithm
@@ -6,14 +8,34 @@ from mesa import Agent
 
 class EchoChamberAgent(Agent):
     """
-    Agent class for YouTube echo chamber simulation.
+    Base agent class for YouTube echo chamber simulation.
     Types: Human (0), AI Agent (1)
     AI Subtypes: Social Bot (0), Recommendation Algorithm (1)
     Preferences: Video Games (0), Sports (1), Politics (2)
+
+    Each role is its own subclass (HumanAgent, BotAgent, RecommenderAgent)
+    with its own step, so no step re-tests the agent's type or subtype.
     """
 
+    # Fixed attribute layout; type, preference, engagement counters and the other
+    # hot fields are properties over the model's arrays, so they need no slot
+    # (subclasses add slots for their role-specific attributes only)
+    __slots__ = ('base_homophily', 'engagement_rate', 'network_influence', 'influence_radius')
+
+    # Simplified network weights (removed temporal)
+    _W_DIRECT = 0.7    # Direct interactions (comments, replies)
+    _W_INDIRECT = 0.3  # Indirect interactions (shared viewers)
+
+    # Different engagement impacts, represents how different types of engagement on Youtube have varying levels of influence
+    _ENG_LIKE = 0.05     # 5% boost to homophily
+    _ENG_COMMENT = 0.10  # 10% boost to homophily
+    _ENG_SHARE = 0.15    # 15% boost to homophily
+    _ENG_BOOSTS = (_ENG_LIKE, _ENG_COMMENT, _ENG_SHARE)  # Indexed by action: like, comment, share
+
+    connection_threshold = 0.3  # Minimum strength to maintain connection
+
     def __init__(self, model, agent_type: int, content_preference: int, base_homophily: float, 
-                 engagement_rate: float = 0.5, ai_subtype: int = 0) -> None:
+                 engagement_rate: float = 0.5) -> None:
         """Create a new agent for YouTube simulation.
         Args:
             model: The model instance the agent belongs to
@@ -21,7 +43,6 @@ class EchoChamberAgent(Agent):
             content_preference: Content preference (0=games, 1=sports, 2=politics)
             base_homophily: Base homophily level before engagement effects (0-1)
             engagement_rate: Base rate of engagement with content (0-1)
-            ai_subtype: For AI agents, specifies bot (0) or recommendation algorithm (1)
         """
         super().__init__(model)
         self.type = agent_type
@@ -38,271 +59,469 @@ class EchoChamberAgent(Agent):
         # Echo chamber strength (affects and is affected by engagement)
         self.echo_chamber_strength = 0.0
         
-        # AI-specific attributes
-        if self.type == 1:  # AI Agent
-            self.ai_subtype = ai_subtype
-            self.amplification_power = 1.0
-            self.bot_cluster_size = 0
-            self.human_influence_radius = 1
-
-            if self.ai_subtype == 1:  # Recommendation Algorithm
-                self.recommendation_strength = 1.0
-                self.success_rate = 0.0
-                self.learning_rate = 0.1
-                self.user_profiles = {}
-                self.recommendation_radius = 2
-                
-                self.bot_influenced_content = {}  # Track content promoted by bot clusters
-                self.bot_influence_weight = 0.3   # Weight given to bot-influenced content
-
         # Network influence attributes
-        self.connections = {}  # Dictionary to store connections and their strengths
+        # Connections and their strengths live in the model's connection_* arrays
         self.network_influence = 0.0  # Current influence level in network
         self.influence_radius = 2  # How far influence spreads
-        self.connection_threshold = 0.3  # Minimum strength to maintain connection
-        
-        # Simplified network weights (removed temporal)
-        self.network_weights = {
-            'direct': 0.7,    # Direct interactions (comments, replies)
-            'indirect': 0.3,  # Indirect interactions (shared viewers)
-        }
 
-    def step(self) -> None:
-        """Determine if agent is happy and move if necessary."""
-        neighbors = self.model.grid.get_neighbors(
-            self.pos, moore=True, radius=self.model.radius
+    # Hot per-agent fields live in the model's arrays, indexed by unique_id
+    @property
+    def type(self):
+        return self.model.types[self.unique_id]
+
+    @type.setter
+    def type(self, value):
+        self.model.types[self.unique_id] = value
+
+    @property
+    def preference(self):
+        return self.model.preferences[self.unique_id]
+
+    @preference.setter
+    def preference(self, value):
+        self.model.preferences[self.unique_id] = value
+
+    @property
+    def current_homophily(self):
+        return self.model.current_homophily[self.unique_id]
+
+    @current_homophily.setter
+    def current_homophily(self, value):
+        self.model.current_homophily[self.unique_id] = value
+
+    @property
+    def likes(self):
+        return self.model.likes[self.unique_id]
+
+    @likes.setter
+    def likes(self, value):
+        self.model.likes[self.unique_id] = value
+
+    @property
+    def comments(self):
+        return self.model.comments[self.unique_id]
+
+    @comments.setter
+    def comments(self, value):
+        self.model.comments[self.unique_id] = value
+
+    @property
+    def shares(self):
+        return self.model.shares[self.unique_id]
+
+    @shares.setter
+    def shares(self, value):
+        self.model.shares[self.unique_id] = value
+
+    @property
+    def echo_chamber_strength(self):
+        return self.model.echo_chamber_strength[self.unique_id]
+
+    @echo_chamber_strength.setter
+    def echo_chamber_strength(self, value):
+        self.model.echo_chamber_strength[self.unique_id] = value
+
+    @property
+    def amplification_power(self):
+        return self.model.amplification_power[self.unique_id]
+
+    @amplification_power.setter
+    def amplification_power(self, value):
+        self.model.amplification_power[self.unique_id] = value
+
+    @property
+    def bot_cluster_size(self):
+        return self.model.bot_cluster_size[self.unique_id]
+
+    @bot_cluster_size.setter
+    def bot_cluster_size(self, value):
+        self.model.bot_cluster_size[self.unique_id] = value
+
+    @property
+    def connection_count(self):
+        return self.model.connection_count[self.unique_id]
+
+    @property
+    def connection_ids(self):
+        """unique_ids of this agent's connections, in the order they were made."""
+        return self.model.connection_ids[self.unique_id, :self.connection_count]
+
+    @property
+    def connection_strengths(self):
+        """Strengths of this agent's connections, aligned with connection_ids."""
+        return self.model.connection_strength[self.unique_id, :self.connection_count]
+
+    def _get_neighbor_ids(self):
+        """Return the unique_ids of the neighboring agents, without building a list of them."""
+        model = self.model
+        return model.neighbor_ids(self.pos, model.radius)
+
+    def _get_neighbors(self):
+        """Return the neighboring agents and their unique_ids (which index the model's arrays)."""
+        model = self.model
+        neighbors = model.grid.get_neighbors(self.pos, moore=True, radius=model.radius)
+        neighbor_ids = np.fromiter(
+            (n.unique_id for n in neighbors), dtype=np.intp, count=len(neighbors))
+        return neighbors, neighbor_ids
+
+    def _score_neighborhood(self, neighbor_ids, ai_subtype):
+        """Content matching (50%), bot influence (30%) and engagement (20%),
+        computed in one compiled pass over the neighbors.
+
+        Returns:
+            (similarity_fraction, bot_neighbors, bot_similarity)
+        """
+        model = self.model
+        return neighbor_similarity(
+            model.types, model.preferences, model.likes, model.comments, model.shares,
+            model.bot_cluster_size, model.amplification_power,
+            neighbor_ids, self.unique_id, ai_subtype,
         )
 
-        if not neighbors:
-            similarity_fraction = 0.0
-        else:
-            # 1. Content Preference Matching (50% of happiness)
-            similar_content = len([n for n in neighbors if n.preference == self.preference])
-            content_similarity = similar_content / len(neighbors)
-            
-            # 2. AI/Bot Influence (30% of happiness)
-            bot_neighbors = len([n for n in neighbors if n.type == 1])
-            bot_similarity = len([n for n in neighbors 
-                                if n.type == 1 and n.preference == self.preference])
-            
-            # Special case: Bot-to-Bot interactions
-            if self.type == 1 and self.ai_subtype == 0:  # If this agent is a bot
-                # Track bot cluster size
-                if bot_neighbors > 0:
-                    self._update_bot_cluster(neighbors)
-                    
-                # Bots with same preference amplify each other
-                if bot_similarity > 0:
-                    # Bots are more influenced by other bots with same preference
-                    bot_influence = (bot_similarity / len(neighbors)) * 0.4  # 40% weight for bots
-                else:
-                    bot_influence = 0.0
-            elif self.type == 0:  # If human user
-                # Humans are influenced by bots
-                if bot_neighbors > 0:
-                    bot_influence = (bot_similarity / bot_neighbors) * 0.3
-                    
-                    # Apply additional influence from bot clusters
-                    cluster_bonus = self._calculate_bot_cluster_influence(neighbors)
-                    bot_influence += cluster_bonus
-                else:
-                    bot_influence = 0.0
-            else:
-                bot_influence = 0.0
-            
-            # 3. Engagement-based Modification (20% of happiness)
-            engagement_factor = (self.likes * 0.05 + 
-                               self.comments * 0.10 + 
-                               self.shares * 0.15) / len(neighbors)
-            engagement_factor = min(0.2, engagement_factor)  # Cap at 20% influence
-            
-            # Combine all factors
-            similarity_fraction = (content_similarity * 0.5 +  # Content matching (50%)
-                                 bot_influence +              # Bot influence (30%)
-                                 engagement_factor)           # Engagement (20%)
-            
-            similarity_fraction = min(1.0, similarity_fraction)  # Cap at 1.0
+    def _mean_connection_strength(self):
+        """Average strength of this agent's connections, or None if it has none.
 
-        if self.type == 1 and self.ai_subtype == 1:  # Recommendation Algorithm
-            # Get users in recommendation radius
-            users = [n for n in neighbors if n.type == 0]
-            
-            for user in users:
-                # 1. Analyze user preferences
-                self._analyze_user_preferences(user)
-                
-                # 2. Generate and apply recommendation
-                recommended_content = self._generate_recommendations(user)
-                
-                # 3. Check if recommendation was successful
-                success = (user.preference == recommended_content and 
-                          user.engagement_rate > user.base_homophily)
-                
-                # 4. Update recommendation model
-                self._update_recommendation_model(success)
-                
-                # 5. Influence user based on recommendation strength
-                if success:
-                    user.current_homophily = min(1.0, 
-                        user.current_homophily + (0.1 * self.recommendation_strength))
-
-        # Add network influence to similarity calculation (after existing similarity calculation)
-        if self.connections:
-            network_similarity = sum(conn['strength'] for conn in self.connections.values()) / len(self.connections)
+        Connections only change at the end of a step, so steps compute this once
+        and share it between the similarity and engagement calculations.
+        """
+        model = self.model
+        uid = self.unique_id
+        n_connections = model.connection_count[uid]
+        return model.connection_strength[uid, :n_connections].mean() if n_connections else None
+
+    def _add_network_influence(self, similarity_fraction, network_similarity):
+        """Add network influence to similarity calculation (after existing similarity calculation)"""
+        if network_similarity is not None:
             # Add 10% network influence to the agent's overall similarity calculation
             similarity_fraction = (similarity_fraction * 0.9 + network_similarity * 0.1)
-        
-        # Update engagement and homophily based on local environment
-        self._update_engagement_and_homophily(similarity_fraction)
+        return similarity_fraction
 
-        # Move if unhappy
-        if similarity_fraction < self.current_homophily:
-            self.model.grid.move_to_empty(self)
-        else:
-            self.model.happy += 1
-            
-            # Bots in clusters increase their amplification power
-            if self.type == 1 and self.bot_cluster_size > 1:
-                self._amplify_bot_power()
+    def _move_if_unhappy(self, similarity_fraction) -> bool:
+        """Move to an empty cell if unhappy, otherwise count as happy. Returns whether happy."""
+        model = self.model
+        if similarity_fraction < model.current_homophily[self.unique_id]:
+            model.move_to_empty(self)
+            return False
+        model.happy += 1
+        return True
 
-        # Update network connections
-        self._update_network_connections(neighbors)
+    def _engage(self, engage_prob: float, network_boost):
+        """Roll for an engagement action and record it.
 
-    def _update_bot_cluster(self, neighbors):
-        """Track the size of bot clusters and update bot metrics."""
-        # Find all bots with same preference in neighborhood
-        similar_bots = [n for n in neighbors if n.type == 1 and n.preference == self.preference]
-        self.bot_cluster_size = len(similar_bots) + 1  # Include self
-        
-        # Update model's tracking of bot clusters
-        if hasattr(self.model, 'bot_clusters'):
-            # Add this bot's cluster to the model's tracking
-            self.model.bot_clusters[self.preference] = max(
-                self.model.bot_clusters.get(self.preference, 0),
-                self.bot_cluster_size
-            )
-
-    def _calculate_bot_cluster_influence(self, neighbors):
-        """Calculate additional influence from bot clusters on human users."""
-        # Get all bots in neighborhood
-        bots = [n for n in neighbors if n.type == 1]
-        
-        if not bots:
-            return 0.0
-            
-        # Calculate influence based on bot cluster sizes and amplification power
-        total_influence = 0.0
-        for bot in bots:
-            if bot.preference == self.preference:
-                # Bots in clusters with same preference have stronger influence
-                cluster_factor = min(0.1, bot.bot_cluster_size * 0.02)  # 2% per bot in cluster, max 10%
-                amplification = bot.amplification_power
-                total_influence += cluster_factor * amplification
-                
-        return min(0.15, total_influence)  # Cap at 15% additional influence
+        Args:
+            engage_prob: Engagement probability before network influence
+            network_boost: Mean connection strength (see _mean_connection_strength)
 
-    def _amplify_bot_power(self):
-        """Increase bot's amplification power based on cluster size and engagement."""
-        # Bots in larger clusters with higher engagement have more influence
-        cluster_bonus = min(0.5, self.bot_cluster_size * 0.1)  # 10% per bot in cluster, max 50%
-        engagement_bonus = min(0.5, (self.likes + self.comments * 2 + self.shares * 3) * 0.01)
+        Returns:
+            The action's homophily boost, or None if the agent did not engage
+        """
+        # Add network influence to engagement probability
+        if network_boost is not None:
+            engage_prob *= (1 + network_boost * 0.2)  # increase engagement probability up to 20% based on connection strength
         
-        # Update amplification power (capped at 3.0)
-        self.amplification_power = min(3.0, 1.0 + cluster_bonus + engagement_bonus)
+        model = self.model
+        random = model.random.random
+        if random() >= engage_prob:
+            return None
+
+        # Like (50%), comment (30%) or share (20%)
+        action_type = random()
+        action = 0 if action_type < 0.5 else (1 if action_type < 0.8 else 2)
+        (model.likes, model.comments, model.shares)[action][self.unique_id] += 1
+        model.engagement_totals[action] += 1
+        return self._ENG_BOOSTS[action]
+
+    def _update_network_connections(self, neighbor_ids):
+        """Update network connections based on interactions and similarity."""
+        # Without neighbors nothing is created or updated, and every kept
+        # connection is already above the threshold, so there is nothing to prune
+        if not neighbor_ids.size:
+            return
+
+        model = self.model
+        uid = self.unique_id
+        model._ensure_connection_capacity(model.connection_count[uid] + len(neighbor_ids))
         
-        # Larger clusters can influence humans from further away
-        self.human_influence_radius = min(3, 1 + (self.bot_cluster_size // 3))
+        # Direct (70% weight) and indirect (30% weight) interaction strengths
+        direct = direct_strengths(model.preferences, model.likes, model.comments,
+                                  model.shares, neighbor_ids, uid)
+        update_connections(
+            model.connection_ids, model.connection_strength,
+            model.connection_last_interaction, model.connection_interaction_count,
+            model.connection_shared_preferences, model.connection_count,
+            model._connection_position, model.preferences, neighbor_ids, direct,
+            uid, model.step_count, self.connection_threshold,
+            self._W_DIRECT, self._W_INDIRECT,
+        )
+
+
+class HumanAgent(EchoChamberAgent):
+    """A human YouTube user."""
+
+    __slots__ = ()
+
+    def __init__(self, model, content_preference: int, base_homophily: float,
+                 engagement_rate: float = 0.5) -> None:
+        super().__init__(model, 0, content_preference, base_homophily, engagement_rate)
+
+    def step(self) -> None:
+        """Score the neighborhood, engage, and move if unhappy."""
+        neighbor_ids = self._get_neighbor_ids()
+        if neighbor_ids.size:
+            similarity_fraction = self._score_neighborhood(neighbor_ids, -1)[0]
+        else:
+            similarity_fraction = 0.0
+
+        network_strength = self._mean_connection_strength()
+        similarity_fraction = self._add_network_influence(similarity_fraction, network_strength)
+        self._update_engagement(similarity_fraction, network_strength)
+        self._move_if_unhappy(similarity_fraction)
+        self._update_network_connections(neighbor_ids)
 
-    def _update_engagement_and_homophily(self, similarity_fraction: float) -> None:
-        """Update agent's engagement and adjust homophily based on echo chamber strength.
+    def _update_engagement(self, similarity_fraction: float, network_strength) -> None:
+        """Update the user's engagement and homophily based on echo chamber strength.
         
         Args:
             similarity_fraction: Fraction of neighbors with same preference (0-1)
             0: None of the neighbors have the same preference
             1: All of the neighbors have the same preference
+            network_strength: Mean connection strength (see _mean_connection_strength)
         """
         # Update echo chamber strength
         self.echo_chamber_strength = similarity_fraction
-        
-        # Calculate engagement probability based on echo chamber strength
-        if self.type == 0:  # Human user
-            # Users engage more in stronger echo chambers
-            engage_prob = self.engagement_rate * (1 + self.echo_chamber_strength)
-        elif self.type == 1 and self.ai_subtype == 0:  # Social bot
-            # Bots maintain higher, more consistent engagement
-            # Bots in clusters engage even more
-            cluster_factor = 1.0 + (self.bot_cluster_size * 0.1)  # 10% boost per bot in cluster
-            engage_prob = self.engagement_rate * 1.5 * cluster_factor
-        elif self.type == 1 and self.ai_subtype == 1:  # Recommendation Algorithm
-            # Recommendations become more effective with higher success rates
-            engage_prob = self.engagement_rate * (1.0 + self.success_rate)
+
+        # Users engage more in stronger echo chambers
+        boost = self._engage(self.engagement_rate * (1 + similarity_fraction), network_strength)
+        if boost is not None:
+            # Engagement increases homophily with weighted impact (capped at 1.0)
+            homophily = self.base_homophily + (boost * similarity_fraction)
+            self.current_homophily = homophily if homophily < 1.0 else 1.0
+
+
+class AIAgent(EchoChamberAgent):
+    """An AI agent: a social bot or a recommendation algorithm."""
+
+    __slots__ = ('human_influence_radius',)
+
+    def __init__(self, model, content_preference: int, base_homophily: float,
+                 engagement_rate: float, ai_subtype: int) -> None:
+        """Create a new AI agent (see EchoChamberAgent).
+
+        Args:
+            ai_subtype: Social bot (0) or recommendation algorithm (1)
+        """
+        super().__init__(model, 1, content_preference, base_homophily, engagement_rate)
+        self.ai_subtype = ai_subtype
+        self.amplification_power = 1.0
+        self.bot_cluster_size = 0
+        self.human_influence_radius = 1
+
+    @property
+    def ai_subtype(self):
+        return self.model.ai_subtypes[self.unique_id]
+
+    @ai_subtype.setter
+    def ai_subtype(self, value):
+        self.model.ai_subtypes[self.unique_id] = value
+
+
+class BotAgent(AIAgent):
+    """A social bot that amplifies content and clusters with like-minded bots."""
+
+    __slots__ = ()
+
+    def __init__(self, model, content_preference: int, base_homophily: float,
+                 engagement_rate: float = 0.5) -> None:
+        super().__init__(model, content_preference, base_homophily, engagement_rate, 0)
+
+    def step(self) -> None:
+        """Like a human's step, but also tracks the bot's cluster and amplifies when happy."""
+        neighbor_ids = self._get_neighbor_ids()
+        if neighbor_ids.size:
+            similarity_fraction, bot_neighbors, bot_similarity = self._score_neighborhood(
+                neighbor_ids, 0)
+
+            # Special case: Bot-to-Bot interactions
+            if bot_neighbors > 0:
+                # Track bot cluster size
+                self._update_bot_cluster(bot_similarity)
         else:
-            engage_prob = 0.0
+            similarity_fraction = 0.0
+
+        network_strength = self._mean_connection_strength()
+        similarity_fraction = self._add_network_influence(similarity_fraction, network_strength)
+        self._update_engagement(similarity_fraction, network_strength)
+        if self._move_if_unhappy(similarity_fraction):
+            # Bots in clusters increase their amplification power
+            if self.bot_cluster_size > 1:
+                self._amplify_bot_power()
+        self._update_network_connections(neighbor_ids)
+
+    def _update_bot_cluster(self, similar_bots: int):
+        """Track the size of bot clusters and update bot metrics.
+
+        Args:
+            similar_bots: Number of bots with same preference in neighborhood
+        """
+        self.bot_cluster_size = similar_bots + 1  # Include self
         
-        # Add network influence to engagement probability
-        if self.connections:
-            network_boost = sum(conn['strength'] for conn in self.connections.values()) / len(self.connections)
-            engage_prob *= (1 + network_boost * 0.2)  # increase engagement probability up to 20% based on connection strength
+        # Add this bot's cluster to the model's tracking
+        bot_clusters = self.model.bot_clusters
+        preference = self.preference
+        bot_clusters[preference] = max(bot_clusters[preference], similar_bots + 1)
+
+    def _amplify_bot_power(self):
+        """Increase bot's amplification power based on cluster size and engagement."""
+        # Bots in larger clusters with higher engagement have more influence
+        cluster_size = self.bot_cluster_size
+        cluster_bonus = cluster_size * 0.1  # 10% per bot in cluster, max 50%
+        if cluster_bonus > 0.5:
+            cluster_bonus = 0.5
+        engagement_bonus = (self.likes + self.comments * 2 + self.shares * 3) * 0.01
+        if engagement_bonus > 0.5:
+            engagement_bonus = 0.5
         
-        # Different engagement impacts, represents how different types of engagement on Youtube have varying levels of influence 
-        engagement_weights = {
-            'like': 0.05, # 5% boost to homophily
-            'comment': 0.10, # 10% boost to homophily
-            'share': 0.15 # 15% boost to homophily
-        }
+        # Update amplification power (capped at 3.0)
+        amplification_power = 1.0 + cluster_bonus + engagement_bonus
+        self.amplification_power = amplification_power if amplification_power < 3.0 else 3.0
         
-        if self.model.random.random() < engage_prob:
-            action_type = self.model.random.random()
-            if action_type < 0.5:
-                self.likes += 1
-                boost = engagement_weights['like']
-            elif action_type < 0.8:
-                self.comments += 1
-                boost = engagement_weights['comment']
-            else:
-                self.shares += 1
-                boost = engagement_weights['share']
-            
-            # Engagement increases homophily with weighted impact
-            if self.type == 0:  # Human users
-                self.current_homophily = min(
-                    1.0,
-                    self.base_homophily + (boost * self.echo_chamber_strength)
-                )
-            elif self.type == 1 and self.ai_subtype == 0:  # Social bots
-                # Bots in clusters have stronger homophily increases
-                cluster_multiplier = 1.0 + (self.bot_cluster_size * 0.1)  # 10% per bot in cluster
-                self.current_homophily = min(
-                    1.0,
-                    self.base_homophily + (boost * 2.0 * cluster_multiplier)
-                )
-
-    def _analyze_user_preferences(self, user):
+        # Larger clusters can influence humans from further away
+        radius = 1 + (cluster_size // 3)
+        self.human_influence_radius = radius if radius < 3 else 3
+
+    def _update_engagement(self, similarity_fraction: float, network_strength) -> None:
+        """Update a social bot's engagement and homophily (see HumanAgent._update_engagement)."""
+        self.echo_chamber_strength = similarity_fraction
+
+        # Bots maintain higher, more consistent engagement
+        # Bots in clusters engage even more
+        cluster_size = self.bot_cluster_size
+        cluster_factor = 1.0 + (cluster_size * 0.1)  # 10% boost per bot in cluster
+        boost = self._engage(self.engagement_rate * 1.5 * cluster_factor, network_strength)
+        if boost is not None:
+            # Bots in clusters have stronger homophily increases
+            cluster_multiplier = 1.0 + (cluster_size * 0.1)  # 10% per bot in cluster
+            homophily = self.base_homophily + (boost * 2.0 * cluster_multiplier)
+            self.current_homophily = homophily if homophily < 1.0 else 1.0
+
+
+class RecommenderAgent(AIAgent):
+    """A recommendation algorithm that profiles nearby users and recommends content to them."""
+
+    __slots__ = (
+        'recommendation_strength', 'success_rate', 'learning_rate', 'recommendation_radius',
+        'user_content_views', 'bot_influenced_content',
+        'bot_influence_weight',
+    )
+
+    def __init__(self, model, content_preference: int, base_homophily: float,
+                 engagement_rate: float = 0.5) -> None:
+        super().__init__(model, content_preference, base_homophily, engagement_rate, 1)
+        self.recommendation_strength = 1.0
+        self.success_rate = 0.0
+        self.learning_rate = 0.1
+        # User profiles: views per content type, keyed by user unique_id
+        self.user_content_views = {}
+        self.recommendation_radius = 2
+
+        self.bot_influenced_content = {}  # Track content promoted by bot clusters
+        self.bot_influence_weight = 0.3   # Weight given to bot-influenced content
+
+    def step(self) -> None:
+        """Like a human's step, but also recommends content to nearby users."""
+        neighbors, neighbor_ids = self._get_neighbors()
+        if neighbors:
+            similarity_fraction = self._score_neighborhood(neighbor_ids, 1)[0]
+        else:
+            similarity_fraction = 0.0
+
+        # Get users in recommendation radius
+        is_user = self.model.types[neighbor_ids] == 0
+        if is_user.any():
+            users = [n for n, user in zip(neighbors, is_user.tolist()) if user]
+            self._recommend_to_users(users, neighbor_ids[is_user])
+
+        network_strength = self._mean_connection_strength()
+        similarity_fraction = self._add_network_influence(similarity_fraction, network_strength)
+        self._update_engagement(similarity_fraction, network_strength)
+        self._move_if_unhappy(similarity_fraction)
+        self._update_network_connections(neighbor_ids)
+
+    def _recommend_to_users(self, users, user_ids):
+        """Profile, recommend content to and influence the given human users.
+
+        Profiles and homophily are updated for all users at once. The
+        recommendations themselves stay in order, since each success or failure
+        changes the strength and weights used for the next user.
+
+        Args:
+            users: Human users in recommendation range
+            user_ids: Their unique_ids, in the same order
+        """
+        model = self.model
+        user_preferences = model.preferences[user_ids]
+
+        # 1. Analyze user preferences
+        self._analyze_user_preferences(user_ids, user_preferences)
+
+        # The grid does not change while recommending, so the bots to amplify
+        # are found once, on the first success
+        similar_bot_ids = None
+
+        influenced = []
+        boosts = []
+        for user, user_preference in zip(users, user_preferences.tolist()):
+            self._analyze_bot_influence(user)
+
+            # 2. Generate and apply recommendation
+            recommended_content = self._generate_recommendations(user)
+
+            # 3. Check if recommendation was successful
+            success = (user_preference == recommended_content and
+                       user.engagement_rate > user.base_homophily)
+
+            # 4. Update recommendation model
+            if success and similar_bot_ids is None:
+                similar_bot_ids = self._similar_bot_ids()
+            self._update_recommendation_model(success, similar_bot_ids)
+            if success:
+                influenced.append(user.unique_id)
+                boosts.append(0.1 * self.recommendation_strength)
+
+        # 5. Influence users based on recommendation strength
+        if influenced:
+            model.current_homophily[influenced] = np.minimum(
+                1.0, model.current_homophily[influenced] + boosts)
+
+    def _similar_bot_ids(self):
+        """unique_ids of social bots within recommendation radius that share this agent's content type."""
+        preference = self.preference
+        return np.array([
+            n.unique_id
+            for n in self.model.grid.iter_neighbors(
+                self.pos, moore=True, radius=self.recommendation_radius)
+            if n.type == 1 and n.ai_subtype == 0 and n.preference == preference
+        ], dtype=np.intp)
+
+    def _analyze_user_preferences(self, user_ids, user_preferences):
         """
         Analyze and update user preference profiles.
-        Only recommendation algorithm can analyze user preferences
-        """ 
-        if self.type != 1 or self.ai_subtype != 1:
-            return
-        
-        user_id = user.unique_id
-        # Create profile dictionary if it doesn't exist
-        if user_id not in self.user_profiles:
-            self.user_profiles[user_id] = {
-                'preference': user.preference,
-                'engagement_history': [],
-                'content_views': {0: 0, 1: 0, 2: 0}
-            }
-        
-        # Update profile based on user's recent activity
-        profile = self.user_profiles[user_id]
-        profile['content_views'][user.preference] += 1
-        profile['engagement_history'].append({
-            'likes': user.likes,
-            'comments': user.comments,
-            'shares': user.shares
-        })
 
+        Args:
+            user_ids: unique_ids of the users to profile (no repeats)
+            user_preferences: The users' content preferences
+        """
+        # Update profiles based on users' recent activity
+        content_views = self.user_content_views
+        for user_id, preference in zip(user_ids.tolist(), user_preferences.tolist()):
+            views = content_views.get(user_id)
+            if views is None:
+                views = content_views[user_id] = [0, 0, 0]
+            views[preference] += 1
+        self.model.recsys_profiled[user_ids] = True
+
+    def _analyze_bot_influence(self, user):
+        """Track content promoted by social bot clusters around a user."""
         # Add bot influence analysis
         neighbors = self.model.grid.get_neighbors(user.pos, moore=True, radius=self.model.radius)
         bot_clusters = {}
@@ -326,156 +545,66 @@ class EchoChamberAgent(Agent):
     def _generate_recommendations(self, target_user):
         """
         Generate personalized content recommendations based on user's profile.
-        Only recommendation algorithm can generate recommendations
         """
-        if self.type != 1 or self.ai_subtype != 1:
-            return None
-        
         # Get user profile to see viewing and engagement history
-        profile = self.user_profiles.get(target_user.unique_id)
-        if not profile:
+        content_views = self.user_content_views.get(target_user.unique_id)
+        if content_views is None:
             return target_user.preference  # Default to user's current preference if no history exists
         
-        # Calculate content scores combining user preference and bot influence
-        content_scores = {}
-        for content_type in [0, 1, 2]:  # All content types
-            # User preference score (70%)
-            user_score = profile['content_views'].get(content_type, 0)
-            
-            # Bot influence score (30%)
-            bot_score = self.bot_influenced_content.get(content_type, 0)
-            
-            # Combine scores with weights
-            content_scores[content_type] = (
-                (user_score * (1 - self.bot_influence_weight)) +
-                (bot_score * self.bot_influence_weight)
-            )
-        
-        # Return content type with highest combined score
-        return max(content_scores.items(), key=lambda x: x[1])[0]
+        # Score each content type combining user preference and bot influence,
+        # keeping the highest combined score in a single pass (first wins ties)
+        bot_weight = self.bot_influence_weight
+        user_weight = 1 - bot_weight
+        best_content, best_score = 0, None
+        for content_type in (0, 1, 2):  # All content types
+            # User preference score (70%) plus bot influence score (30%)
+            score = (content_views[content_type] * user_weight +
+                     self.bot_influenced_content.get(content_type, 0) * bot_weight)
+            if best_score is None or score > best_score:
+                best_content, best_score = content_type, score
+        return best_content
 
-    def _update_recommendation_model(self, success: bool):
+    def _update_recommendation_model(self, success: bool, similar_bot_ids):
         """
         Update recommendation algorithm based on success/failure.
-        Only recommendation algorithm can update the recommendation model
+
+        Args:
+            success: Whether the recommendation was successful
+            similar_bot_ids: unique_ids of nearby social bots sharing this agent's
+                content type (see _similar_bot_ids); only used on success
         """
-        if self.type != 1 or self.ai_subtype != 1:
-            return
-        
         # Update success rate and recommendation strength based on success/failure
         if success:
             # Update success rate with exponential moving average (EMA)
             # 90% weight to the old success rate, 10% weight to the new success rate
             self.success_rate = (self.success_rate * 0.9) + (0.1 * 1.0)
             # Increase recommendation strength with successful recommendations
-            self.recommendation_strength = min(3.0, 
-                self.recommendation_strength + (self.learning_rate * self.success_rate))
+            strength = self.recommendation_strength + (self.learning_rate * self.success_rate)
+            self.recommendation_strength = strength if strength < 3.0 else 3.0
             
             # Strengthen bot influence weight on successful recommendations
-            self.bot_influence_weight = min(0.5, self.bot_influence_weight + 0.01)
+            weight = self.bot_influence_weight + 0.01
+            self.bot_influence_weight = weight if weight < 0.5 else 0.5
             
             # Amplify nearby bot clusters that share the recommended content
-            neighbors = self.model.grid.get_neighbors(
-                self.pos, moore=True, radius=self.recommendation_radius
-            )
-            for neighbor in neighbors:
-                if (neighbor.type == 1 and 
-                    neighbor.ai_subtype == 0 and  # Is social bot
-                    neighbor.preference == self.preference):  # Shares content type
-                    # Boost bot's amplification power
-                    neighbor.amplification_power = min(
-                        3.0,
-                        neighbor.amplification_power * 1.1  # 10% boost
-                    )
+            # Boost bots' amplification power by 10%
+            amplification_power = self.model.amplification_power
+            amplification_power[similar_bot_ids] = np.minimum(
+                3.0, amplification_power[similar_bot_ids] * 1.1)
         else:
             # Decrease success rate with unsuccessful recommendations
             self.success_rate = self.success_rate * 0.9
             # Reduce recommendation strength with unsuccessful recommendations
-            self.recommendation_strength = max(0.5, 
-                self.recommendation_strength - (self.learning_rate * 0.5))
+            strength = self.recommendation_strength - (self.learning_rate * 0.5)
+            self.recommendation_strength = strength if strength > 0.5 else 0.5
             
             # Reduce bot influence weight on failed recommendations
-            self.bot_influence_weight = max(0.1, self.bot_influence_weight - 0.01)
-
-    def _update_network_connections(self, neighbors):
-        """Update network connections based on interactions and similarity."""
-        for neighbor in neighbors:
-            neighbor_id = neighbor.unique_id
-            
-            # Calculate connection strength based on direct and indirect interactions
-            connection_strength = self._calculate_connection_strength(neighbor)
-            
-            # Update or create connection if strength is above threshold (0.3)
-            if connection_strength > self.connection_threshold:
-                if neighbor_id not in self.connections:
-                    # Create new connection
-                    self.connections[neighbor_id] = {
-                        'strength': connection_strength,
-                        'last_interaction': self.model.step_count,
-                        'shared_preferences': self.preference == neighbor.preference,
-                        'interaction_count': 1
-                    }
-                else:
-                    # Update existing connection (80% old strength, 20% new strength)
-                    self.connections[neighbor_id]['strength'] = (
-                        self.connections[neighbor_id]['strength'] * 0.8 + 
-                        connection_strength * 0.2
-                    )
-                    self.connections[neighbor_id]['last_interaction'] = self.model.step_count
-                    self.connections[neighbor_id]['interaction_count'] += 1
-            
-            # Remove weak connections
-            self.connections = {k: v for k, v in self.connections.items() 
-                              if v['strength'] > self.connection_threshold}
-
-    def _calculate_connection_strength(self, other_agent):
-        """Calculate the strength of connection between two agents."""
-        # Direct interaction strength (70% weight)
-        direct_strength = self._calculate_direct_strength(other_agent)
-        
-        # Indirect interaction strength (30% weight)
-        indirect_strength = self._calculate_indirect_strength(other_agent)
-        
-        # Combine factors with simplified weights
-        total_strength = (
-            direct_strength * self.network_weights['direct'] + #0.7
-            indirect_strength * self.network_weights['indirect'] #0.3
-        )
-        
-        return min(1.0, total_strength)
+            weight = self.bot_influence_weight - 0.01
+            self.bot_influence_weight = weight if weight > 0.1 else 0.1
 
-    def _calculate_direct_strength(self, other_agent):
-        """
-        Calculate strength from direct interactions.
-        Same content preferences and Similar engagement patterns (likes, comments, shares)
-        """
-        # Content preference similarity
-        preference_match = 1.0 if self.preference == other_agent.preference else 0.3
-        
-        # how similar their engagement patterns are
-        engagement_similarity = min(1.0, (
-            abs(self.likes - other_agent.likes) * 0.3 +
-            abs(self.comments - other_agent.comments) * 0.4 +
-            abs(self.shares - other_agent.shares) * 0.3
-        ) / 10)
-        
-        return (preference_match + engagement_similarity) / 2
+    def _update_engagement(self, similarity_fraction: float, network_strength) -> None:
+        """Update a recommendation algorithm's engagement (see HumanAgent._update_engagement)."""
+        self.echo_chamber_strength = similarity_fraction
 
-    def _calculate_indirect_strength(self, other_agent):
-        """
-        Calculate strength from indirect connections.
-        Shared connections with other agents
-        """
-        # Get shared connections
-        shared_connections = set(self.connections.keys()) & set(other_agent.connections.keys())
-        if not shared_connections:
-            return 0.0
-        
-        # Calculate average strength of shared connections
-        total_strength = sum(
-            min(self.connections[conn_id]['strength'],
-                other_agent.connections[conn_id]['strength'])
-            for conn_id in shared_connections
-        )
-        
-        return min(1.0, total_strength / len(shared_connections))
\ No newline at end of file
+        # Recommendations become more effective with higher success rates
+        self._engage(self.engagement_rate * (1.0 + self.success_rate), network_strength)
@@ -1,6 +1,4 @@
 import solara
-import matplotlib.pyplot as plt
-import pandas as pd
 from mesa.visualization import (
     Slider,
     SolaraViz,
@@ -8,7 +6,7 @@ from mesa.visualization import (
     make_space_component,
 )
 from model import EchoChamber  
-from agents import EchoChamberAgent  
+from agents import BotAgent, EchoChamberAgent, HumanAgent, RecommenderAgent
 
 # Function to create a new model instance when needed
 def create_model():
@@ -19,21 +17,22 @@ def create_model():
         recsys_ratio=0.3  # Added: control ratio of recommendation algorithms to social bots
     )
 
+# Portrayal lookup tables, built once instead of on every call
+CONTENT_COLORS = ("tab:orange", "tab:blue", "tab:red")  # Indexed by content preference
+AGENT_MARKERS = {HumanAgent: "o", BotAgent: "s", RecommenderAgent: "^"}
+
 # Agent Portrayal Function 
 def agent_portrayal(agent: EchoChamberAgent):
     """Defines how agents are displayed in the visualization based on content preference."""
-    content_colors = {0: "tab:orange", 1: "tab:blue", 2: "tab:red"}  
     portrayal = {
-        "color": content_colors.get(agent.preference, "gray"),
-        "marker": ("o" if agent.type == 0 else  # Human
-                  "s" if (agent.type == 1 and agent.ai_subtype == 0) else  # Social Bot
-                  "^"),  # Recommendation Algorithm
+        "color": CONTENT_COLORS[agent.preference],
+        "marker": AGENT_MARKERS[type(agent)],  # Human (o), Social Bot (s), Recommendation Algorithm (^)
         "size": 10 + (agent.engagement_rate * 5),
         "alpha": min(1.0, 0.5 + (agent.network_influence * 0.5)),
     }
     
     # Add visual indicators for recommendation algorithms
-    if agent.type == 1 and agent.ai_subtype == 1:
+    if type(agent) is RecommenderAgent:
         portrayal["size"] += agent.recommendation_strength * 2
         portrayal["alpha"] = min(1.0, 0.5 + agent.success_rate)
     
@@ -56,9 +55,9 @@ model_params = {
 # Visualization components
 def DisplayModelInfo(model):
     # Count agent types
-    human_count = sum(1 for a in model.agent_list if a.type == 0)
-    bot_count = sum(1 for a in model.agent_list if a.type == 1 and a.ai_subtype == 0)
-    recsys_count = sum(1 for a in model.agent_list if a.type == 1 and a.ai_subtype == 1)
+    human_count = len(model.human_agents)
+    bot_count = len(model.social_bot_ids)
+    recsys_count = len(model.recsys_agents)
 
     markdown_text = f"""
     ## 🧠 **Model Legend**
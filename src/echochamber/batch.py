@@ -0,0 +1,52 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from model import EchoChamber
+
+# Run independent simulations (replicates or parameter sweeps) in parallel,
+# one model per worker process.
+
+
+def run_single(params, max_steps=100):
+    """Run one model until it stops or reaches max_steps.
+
+    Args:
+        params: Keyword arguments for EchoChamber
+        max_steps: Maximum number of steps to run
+
+    Returns:
+        The model-level DataFrame from the model's DataCollector
+    """
+    model = EchoChamber(**params)
+    while model.running and model.step_count < max_steps:
+        model.step()
+    model.collect_final_state()
+    return model.datacollector.get_model_vars_dataframe()
+
+
+def run_batch(params_list, max_steps=100, n_workers=None):
+    """Run one model per parameter dict across worker processes.
+
+    Args:
+        params_list: List of keyword-argument dicts for EchoChamber
+        max_steps: Maximum number of steps to run each model
+        n_workers: Number of worker processes (defaults to the CPU count)
+
+    Returns:
+        List of model-level DataFrames, in the same order as params_list
+    """
+    n_workers = n_workers or os.cpu_count()
+    # spawn rather than fork, so workers don't inherit the parent's numpy/numba threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=context) as executor:
+        return list(executor.map(partial(run_single, max_steps=max_steps), params_list))
+
+
+if __name__ == "__main__":
+    # Example: AI population ratio sweep, three replicates each
+    sweep = [{"ai_ratio": ratio, "seed": seed}
+             for ratio in (0.2, 0.5, 0.8) for seed in range(3)]
+    for params, results in zip(sweep, run_batch(sweep)):
+        print(params, "final happy %:", round(results["Happy Agents %"].iloc[-1], 1))
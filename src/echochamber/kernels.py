@@ -0,0 +1,176 @@
+import numpy as np
+from numba import njit
+
+# Compiled kernels for the per-agent arithmetic in EchoChamberAgent.
+# They read the model's per-agent arrays (indexed by unique_id) directly.
+# fastmath is left off so results match the plain Python arithmetic exactly.
+
+# Weight of each engagement type in an agent's engagement factor
+# (module constants, so numba compiles them in as literals)
+_LIKE_W = 0.05
+_COMMENT_W = 0.10
+_SHARE_W = 0.15
+
+
+@njit(cache=True)
+def neighbor_similarity(types, preferences, likes, comments, shares,
+                        bot_cluster_size, amplification_power,
+                        neighbor_ids, agent_id, ai_subtype):
+    """Score an agent's neighborhood in a single pass over its neighbors.
+
+    Args:
+        types, preferences, likes, comments, shares, bot_cluster_size,
+        amplification_power: The model's per-agent arrays
+        neighbor_ids: unique_ids of the agent's neighbors (non-empty)
+        agent_id: unique_id of the agent being scored
+        ai_subtype: The agent's AI subtype, or -1 for human users
+
+    Returns:
+        (similarity_fraction, bot_neighbors, bot_similarity)
+    """
+    n_neighbors = neighbor_ids.shape[0]
+    agent_type = types[agent_id]
+    preference = preferences[agent_id]
+
+    similar_content = 0
+    bot_neighbors = 0
+    bot_similarity = 0
+    cluster_influence = 0.0
+    for i in range(n_neighbors):
+        j = neighbor_ids[i]
+        same_preference = preferences[j] == preference
+        if same_preference:
+            similar_content += 1
+        if types[j] == 1:
+            bot_neighbors += 1
+            if same_preference:
+                bot_similarity += 1
+                # Bots in clusters with same preference have stronger influence
+                cluster_factor = min(0.1, bot_cluster_size[j] * 0.02)  # 2% per bot in cluster, max 10%
+                cluster_influence += cluster_factor * amplification_power[j]
+
+    # 1. Content Preference Matching (50% of happiness)
+    content_similarity = similar_content / n_neighbors
+
+    # 2. AI/Bot Influence (30% of happiness)
+    bot_influence = 0.0
+    if agent_type == 1 and ai_subtype == 0:  # If this agent is a bot
+        # Bots are more influenced by other bots with same preference
+        if bot_similarity > 0:
+            bot_influence = (bot_similarity / n_neighbors) * 0.4  # 40% weight for bots
+    elif agent_type == 0:  # If human user
+        # Humans are influenced by bots, plus additional influence from bot clusters
+        if bot_neighbors > 0:
+            bot_influence = (bot_similarity / bot_neighbors) * 0.3
+            bot_influence += min(0.15, cluster_influence)  # Cap at 15% additional influence
+
+    # 3. Engagement-based Modification (20% of happiness)
+    engagement_factor = (likes[agent_id] * _LIKE_W +
+                         comments[agent_id] * _COMMENT_W +
+                         shares[agent_id] * _SHARE_W) / n_neighbors
+    engagement_factor = min(0.2, engagement_factor)  # Cap at 20% influence
+
+    # Combine all factors
+    similarity_fraction = (content_similarity * 0.5 +  # Content matching (50%)
+                           bot_influence +              # Bot influence (30%)
+                           engagement_factor)           # Engagement (20%)
+
+    return min(1.0, similarity_fraction), bot_neighbors, bot_similarity
+
+
+@njit(cache=True)
+def direct_strengths(preferences, likes, comments, shares, neighbor_ids, agent_id):
+    """Direct interaction strength between an agent and each of its neighbors.
+
+    Same content preferences and similar engagement patterns (likes, comments, shares)
+    """
+    n_neighbors = neighbor_ids.shape[0]
+    strengths = np.empty(n_neighbors)
+    for i in range(n_neighbors):
+        j = neighbor_ids[i]
+        # Content preference similarity
+        preference_match = 1.0 if preferences[agent_id] == preferences[j] else 0.3
+
+        # how similar their engagement patterns are
+        engagement_similarity = min(1.0, (
+            abs(likes[agent_id] - likes[j]) * 0.3 +
+            abs(comments[agent_id] - comments[j]) * 0.4 +
+            abs(shares[agent_id] - shares[j]) * 0.3
+        ) / 10)
+
+        strengths[i] = (preference_match + engagement_similarity) / 2
+    return strengths
+
+
+@njit(cache=True)
+def update_connections(connection_ids, connection_strength, connection_last_interaction,
+                       connection_interaction_count, connection_shared_preferences,
+                       connection_count, position, preferences, neighbor_ids, direct,
+                       agent_id, step_count, threshold, direct_weight, indirect_weight):
+    """Update an agent's connection row from its neighbors, in neighbor order.
+
+    Each agent's connections are the first connection_count[agent_id] entries of
+    its row in the connection_* arrays, kept in insertion order. The row must have
+    room for one new connection per neighbor.
+
+    Args:
+        position: Scratch array filled with -1, used to look up an id's slot in
+            the agent's row; it is restored to -1 before returning
+        direct: Direct interaction strength with each neighbor (see direct_strengths)
+    """
+    ids = connection_ids[agent_id]
+    strengths = connection_strength[agent_id]
+    n_connections = connection_count[agent_id]
+    for k in range(n_connections):
+        position[ids[k]] = k
+
+    for i in range(neighbor_ids.shape[0]):
+        neighbor_id = neighbor_ids[i]
+
+        # Indirect interaction strength: average over shared connections of the
+        # weaker of the two connection strengths
+        shared_connections = 0
+        shared_strength = 0.0
+        for k in range(connection_count[neighbor_id]):
+            p = position[connection_ids[neighbor_id, k]]
+            if p >= 0:
+                shared_connections += 1
+                shared_strength += min(strengths[p], connection_strength[neighbor_id, k])
+        indirect_strength = 0.0
+        if shared_connections > 0:
+            indirect_strength = min(1.0, shared_strength / shared_connections)
+
+        # Combine factors with simplified weights
+        total_strength = min(1.0, direct[i] * direct_weight + indirect_strength * indirect_weight)
+
+        # Update or create connection if strength is above threshold (0.3)
+        if total_strength > threshold:
+            p = position[neighbor_id]
+            if p < 0:
+                # Create new connection
+                ids[n_connections] = neighbor_id
+                strengths[n_connections] = total_strength
+                connection_last_interaction[agent_id, n_connections] = step_count
+                connection_interaction_count[agent_id, n_connections] = 1
+                connection_shared_preferences[agent_id, n_connections] = (
+                    preferences[agent_id] == preferences[neighbor_id])
+                position[neighbor_id] = n_connections
+                n_connections += 1
+            else:
+                # Update existing connection (80% old strength, 20% new strength)
+                strengths[p] = strengths[p] * 0.8 + total_strength * 0.2
+                connection_last_interaction[agent_id, p] = step_count
+                connection_interaction_count[agent_id, p] += 1
+
+    # Remove weak connections, keeping the rest in insertion order
+    kept = 0
+    for k in range(n_connections):
+        position[ids[k]] = -1
+        if strengths[k] > threshold:
+            ids[kept] = ids[k]
+            strengths[kept] = strengths[k]
+            connection_last_interaction[agent_id, kept] = connection_last_interaction[agent_id, k]
+            connection_interaction_count[agent_id, kept] = connection_interaction_count[agent_id, k]
+            connection_shared_preferences[agent_id, kept] = connection_shared_preferences[agent_id, k]
+            kept += 1
+    connection_count[agent_id] = kept
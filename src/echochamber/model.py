@@ -1,8 +1,9 @@
 from mesa import Model
 from mesa.datacollection import DataCollector
 from mesa.space import SingleGrid
-from agents import EchoChamberAgent  
-import random
+from agents import BotAgent, HumanAgent, RecommenderAgent
+import numpy as np
+import pandas as pd
 
 class EchoChamber(Model):
     """Model class for the YouTube Echo chamber model."""
@@ -19,6 +20,8 @@ class EchoChamber(Model):
         ai_ratio=0.5,
         recsys_ratio=0.3,
         radius=1,
+        collect_agents=False,
+        collect_every=1,
         seed=None,
     ):
         """
@@ -33,6 +36,11 @@ class EchoChamber(Model):
             ai_ratio: Fraction of agents that are AI
             recsys_ratio: Fraction of AI agents that are recommendation algorithms
             radius: Search radius for checking neighbor similarity
+            collect_agents: If True, also record every agent's state at each step
+                (otherwise use agent_snapshot() for the current state)
+            collect_every: Collect data every this many steps (the initial state and
+                the step the model stops on are always collected; runs stopped from
+                outside, e.g. at a step cap, should call collect_final_state())
             max_steps: Maximum number of steps before simulation stops
             seed: Seed for reproducibility
         """
@@ -49,6 +57,7 @@ class EchoChamber(Model):
         self.ai_ratio = ai_ratio
         self.recsys_ratio = recsys_ratio
         self.radius = radius
+        self.collect_every = max(1, collect_every)
         
         # Plateau stopping parameters
         self.prev_happy_ratio = None
@@ -63,47 +72,113 @@ class EchoChamber(Model):
         self.grid = SingleGrid(width, height, torus=True)
         self.agent_list = [] 
 
+        # Per-agent state stored as parallel arrays indexed by unique_id
+        # (ids start at 1, and there is at most one agent per cell)
+        capacity = width * height + 1
+        self.types = np.zeros(capacity, dtype=np.uint8)
+        self.preferences = np.zeros(capacity, dtype=np.uint8)
+        self.ai_subtypes = np.full(capacity, -1, dtype=np.int8)  # -1 for human users
+        self.current_homophily = np.zeros(capacity, dtype=np.float64)
+        self.likes = np.zeros(capacity, dtype=np.int32)
+        self.comments = np.zeros(capacity, dtype=np.int32)
+        self.shares = np.zeros(capacity, dtype=np.int32)
+        self.echo_chamber_strength = np.zeros(capacity, dtype=np.float64)
+        self.amplification_power = np.zeros(capacity, dtype=np.float64)
+        self.bot_cluster_size = np.zeros(capacity, dtype=np.int32)
+
+        # Network connections: row i holds agent i's first connection_count[i]
+        # connections in the order they were made (rows grow as needed)
+        self.connection_count = np.zeros(capacity, dtype=np.int32)
+        self.connection_ids = np.zeros((capacity, 16), dtype=np.intp)
+        self.connection_strength = np.zeros((capacity, 16), dtype=np.float64)
+        self.connection_last_interaction = np.zeros((capacity, 16), dtype=np.int32)
+        self.connection_interaction_count = np.zeros((capacity, 16), dtype=np.int32)
+        self.connection_shared_preferences = np.zeros((capacity, 16), dtype=np.bool_)
+        self._connection_position = np.full(capacity, -1, dtype=np.intp)
+
+        # unique_id of the agent in each cell (0 = empty), flat index x * height + y,
+        # and each cell's neighborhood per radius (built on first use).
+        # Agents must move through EchoChamber.move_to_empty to keep cell_ids in sync.
+        self.cell_ids = np.zeros(width * height, dtype=np.intp)
+        self._neighborhoods = {}
+
         # Track happiness
         self.happy = 0
 
+        # Running totals of likes, comments and shares across all agents
+        self.engagement_totals = [0, 0, 0]
+
+        # Users profiled by any recommendation algorithm so far
+        self.recsys_profiled = np.zeros(capacity, dtype=bool)
+
+        # Largest social bot cluster seen so far, per content preference
+        self.bot_clusters = [0, 0, 0]
+
         # Create agents
-        for _, pos in self.grid.coord_iter():
-            if random.random() < self.density:
-                is_ai = random.random() < self.ai_ratio # AI ratio control
-                ai_subtype = None
-                
-                if is_ai:
-                    # Determine if AI agent is recommendation algorithm or social bot
-                    is_recsys = random.random() < self.recsys_ratio
-                    ai_subtype = 1 if is_recsys else 0
-                
-                preference = random.choice([0, 1, 2]) # Video Games, Sports, Politics
-                engagement = (
-                    random.uniform(0.5, 1.0) * ai_engagement if is_ai
-                    else random.uniform(0.2, 1.0) * human_engagement
-                )
-                
-                agent = EchoChamberAgent(
-                    model=self,
-                    agent_type=1 if is_ai else 0,  # AI = 1, Human = 0
-                    content_preference=preference,
-                    base_homophily=ai_homophily if is_ai else human_homophily,
-                    engagement_rate=engagement,
-                    ai_subtype=ai_subtype,
-                )
-                
-                self.grid.place_agent(agent, pos)
-                self.agent_list.append(agent)  
+        # Every cell's random choices are drawn at once, in grid order (cell i is
+        # at (i // height, i % height)), from a generator seeded off the model's
+        # own RNG (so any seed Mesa accepts works, including strings from the UI)
+        rng = np.random.default_rng(self.random.getrandbits(64))
+        n_cells = width * height
+        occupied = rng.random(n_cells) < self.density
+        is_ai = rng.random(n_cells) < self.ai_ratio  # AI ratio control
+        # Determine if AI agent is recommendation algorithm or social bot
+        is_recsys = rng.random(n_cells) < self.recsys_ratio
+        preferences = rng.integers(0, 3, n_cells)  # Video Games, Sports, Politics
+        engagements = np.where(
+            is_ai,
+            rng.uniform(0.5, 1.0, n_cells) * ai_engagement,
+            rng.uniform(0.2, 1.0, n_cells) * human_engagement,
+        )
+
+        for cell in np.flatnonzero(occupied).tolist():
+            if is_ai[cell]:
+                agent_class = RecommenderAgent if is_recsys[cell] else BotAgent
+            else:
+                agent_class = HumanAgent
+
+            agent = agent_class(
+                model=self,
+                content_preference=int(preferences[cell]),
+                base_homophily=ai_homophily if is_ai[cell] else human_homophily,
+                engagement_rate=float(engagements[cell]),
+            )
+
+            self.grid.place_agent(agent, (cell // height, cell % height))
+            self.cell_ids[cell] = agent.unique_id
+            self.agent_list.append(agent)
+
+        # Number and unique_ids of all agents, for reporters that reduce over the arrays
+        self.n_agents = len(self.agent_list)
+        self.agent_ids = np.fromiter(
+            (a.unique_id for a in self.agent_list), dtype=np.intp, count=self.n_agents)
+
+        # Agents never change role or leave, so partition them once for the reporters
+        self.human_agents = [a for a in self.agent_list if type(a) is HumanAgent]
+        self.recsys_agents = [a for a in self.agent_list if type(a) is RecommenderAgent]
+        self.social_bot_ids = self.agent_ids[self.ai_subtypes[self.agent_ids] == 0]
 
         # Data collection
+        agent_reporters = None
+        if collect_agents:
+            agent_reporters = {
+                "Type": lambda a: "Human" if a.type == 0 else ("Bot" if a.ai_subtype == 0 else "RecSys"),
+                "Preference": "preference",
+                "Engagement": "engagement_rate",
+                "Network Influence": "network_influence",
+                "Echo Chamber Strength": "echo_chamber_strength",
+                "Connection Count": "connection_count",
+                "Bot Cluster Size": lambda a: a.bot_cluster_size if (a.type == 1 and a.ai_subtype == 0) else 0,
+                "Is Happy": lambda a: a.current_homophily <= a.echo_chamber_strength
+            }
         self.datacollector = DataCollector(
             model_reporters={
+                # Step each row was collected at (rows are every collect_every steps)
+                "Step": "step_count",
+
                 # Happy agents and cluster tracking
-                "Happy Agents %": lambda m: (m.happy / len(m.agent_list)) * 100 if m.agent_list else 0,
-                "Social Bot Cluster %": lambda m: sum(
-                    1 for a in m.agent_list 
-                    if a.type == 1 and a.ai_subtype == 0 and a.bot_cluster_size > 1
-                ) / len(m.agent_list) * 100 if m.agent_list else 0,
+                "Happy Agents %": lambda m: (m.happy / m.n_agents) * 100 if m.n_agents else 0,
+                "Social Bot Cluster %": self._get_bot_cluster_pct,
                 
                 # Network metrics
                 "Average Connection Strength": self._get_avg_connection_strength,
@@ -118,99 +193,170 @@ class EchoChamber(Model):
                 "Echo Chamber Strength": self._get_echo_chamber_strength_pct,
                 
                 # Engagement metrics
-                "Total Likes": lambda m: sum(a.likes for a in m.agent_list),
-                "Total Comments": lambda m: sum(a.comments for a in m.agent_list),
-                "Total Shares": lambda m: sum(a.shares for a in m.agent_list),
+                "Total Likes": lambda m: m.engagement_totals[0],
+                "Total Comments": lambda m: m.engagement_totals[1],
+                "Total Shares": lambda m: m.engagement_totals[2],
 
-                "Total Bot Influence": lambda m: sum(
-                    a.amplification_power + len(a.connections) * 0.5 + sum(c['strength'] for c in a.connections.values())
-                    for a in m.agent_list if a.type == 1 and a.ai_subtype == 0
-                ),
+                "Total Bot Influence": self._get_total_bot_influence,
 
                 "Total RecSys Influence": lambda m: sum(
-                    a.recommendation_strength * 1.5 + a.success_rate * 2 + len(a.user_profiles) * 0.5
-                    for a in m.agent_list if a.type == 1 and a.ai_subtype == 1
+                    a.recommendation_strength * 1.5 + a.success_rate * 2 + len(a.user_content_views) * 0.5
+                    for a in m.recsys_agents
                 ),
 
             },
-            agent_reporters={
-                "Type": lambda a: "Human" if a.type == 0 else ("Bot" if a.ai_subtype == 0 else "RecSys"),
-                "Preference": "preference",
-                "Engagement": "engagement_rate",
-                "Network Influence": "network_influence",
-                "Echo Chamber Strength": "echo_chamber_strength",
-                "Connection Count": lambda a: len(a.connections),
-                "Bot Cluster Size": lambda a: a.bot_cluster_size if (a.type == 1 and a.ai_subtype == 0) else 0,
-                "Is Happy": lambda a: a.current_homophily <= a.echo_chamber_strength
-            }
+            agent_reporters=agent_reporters,
         )
 
         # Collect initial state
+        self._collect()
+
+    def _collect(self):
+        """Collect data for the current step"""
         self.datacollector.collect(self)
+        self._last_collected_step = self.step_count
+
+    def collect_final_state(self):
+        """Collect the current step if collect_every skipped it, so a run's last row is its final state"""
+        if self._last_collected_step != self.step_count:
+            self._collect()
+
+    def agent_snapshot(self):
+        """Current state of every agent, with the same columns as the agent reporters.
+
+        Returns:
+            DataFrame indexed by AgentID, built from the model's per-agent arrays
+        """
+        ids = self.agent_ids
+        types = self.types[ids]
+        subtypes = self.ai_subtypes[ids]
+        echo = self.echo_chamber_strength[ids]
+        # 0 = Human, 1 = Bot, 2 = RecSys
+        labels = np.array(["Human", "Bot", "RecSys"])[np.where(types == 0, 0, subtypes + 1)]
+        return pd.DataFrame(
+            {
+                "Type": labels,
+                "Preference": self.preferences[ids],
+                "Engagement": [a.engagement_rate for a in self.agent_list],
+                "Network Influence": [a.network_influence for a in self.agent_list],
+                "Echo Chamber Strength": echo,
+                "Connection Count": self.connection_count[ids],
+                "Bot Cluster Size": np.where(subtypes == 0, self.bot_cluster_size[ids], 0),
+                "Is Happy": self.current_homophily[ids] <= echo,
+            },
+            index=pd.Index(ids, name="AgentID"),
+        )
 
     def _get_type_percentage(self, agent_type, ai_subtype=None):
         """Calculate percentage of specific agent type"""
-        count = sum(1 for a in self.agent_list 
-                   if a.type == agent_type and 
-                   (ai_subtype is None or a.ai_subtype == ai_subtype))
-        return (count / len(self.agent_list)) * 100 if self.agent_list else 0
+        ids = self.agent_ids
+        matches = self.types[ids] == agent_type
+        if ai_subtype is not None:
+            matches &= self.ai_subtypes[ids] == ai_subtype
+        return (np.count_nonzero(matches) / self.n_agents) * 100 if self.n_agents else 0
+
+    def _get_bot_cluster_pct(self):
+        """Calculate percentage of agents that are social bots in a cluster"""
+        bots = self.social_bot_ids
+        clustered = np.count_nonzero(self.bot_cluster_size[bots] > 1)
+        return clustered / self.n_agents * 100 if self.n_agents else 0
+
+    def _get_total_bot_influence(self):
+        """Sum of social bots' amplification power, connection count and connection strength"""
+        bots = self.social_bot_ids
+        counts = self.connection_count[bots]
+        in_use = np.arange(self.connection_strength.shape[1]) < counts[:, None]
+        strength_sums = np.where(in_use, self.connection_strength[bots], 0.0).sum(axis=1)
+        return float((self.amplification_power[bots] + counts * 0.5 + strength_sums).sum())
+
+    def _ensure_connection_capacity(self, needed):
+        """Widen the connection arrays so every row can hold `needed` connections"""
+        width = self.connection_ids.shape[1]
+        if needed <= width:
+            return
+        while width < needed:
+            width *= 2
+        for name in ("connection_ids", "connection_strength", "connection_last_interaction",
+                     "connection_interaction_count", "connection_shared_preferences"):
+            old = getattr(self, name)
+            new = np.zeros((old.shape[0], width), dtype=old.dtype)
+            new[:, :old.shape[1]] = old
+            setattr(self, name, new)
 
     def _get_avg_connection_strength(self):
         """Calculate average connection strength across all agents"""
-        strengths = [
-            strength['strength']
-            for agent in self.agent_list
-            for strength in agent.connections.values()
-        ]
-        return sum(strengths) / len(strengths) if strengths else 0
+        in_use = np.arange(self.connection_strength.shape[1]) < self.connection_count[:, None]
+        strengths = self.connection_strength[in_use]
+        return float(strengths.mean()) if strengths.size else 0
 
     def _get_network_density(self):
         """Calculate network density"""
-        total_possible = len(self.agent_list) * (len(self.agent_list) - 1)
-        total_connections = sum(len(a.connections) for a in self.agent_list)
+        n_agents = self.n_agents
+        total_possible = n_agents * (n_agents - 1)
+        total_connections = int(self.connection_count.sum())
         return total_connections / total_possible if total_possible > 0 else 0
 
     def _get_recommendation_success_rate(self):
         """Calculate average recommendation success rate"""
-        recsys_agents = [a for a in self.agent_list if a.type == 1 and a.ai_subtype == 1]
+        recsys_agents = self.recsys_agents
         return sum(a.success_rate for a in recsys_agents) / len(recsys_agents) if recsys_agents else 0
 
     def _get_avg_recommendation_strength(self):
         """Calculate average recommendation strength"""
-        recsys_agents = [a for a in self.agent_list if a.type == 1 and a.ai_subtype == 1]
+        recsys_agents = self.recsys_agents
         return sum(a.recommendation_strength for a in recsys_agents) / len(recsys_agents) if recsys_agents else 0
 
     def _get_echo_chamber_strength_pct(self):
         """Calculate average echo chamber strength"""
-        return (sum(a.echo_chamber_strength for a in self.agent_list) / len(self.agent_list)) * 100 if self.agent_list else 0
+        ids = self.agent_ids
+        return float(self.echo_chamber_strength[ids].mean()) * 100 if self.n_agents else 0
 
     def _get_recsys_influence_reach(self):
         """Calculate the percentage of unique human users influenced by recommendation algorithms"""
-        recsys_agents = [a for a in self.agent_list if a.type == 1 and a.ai_subtype == 1]
-        human_agents = [a for a in self.agent_list if a.type == 0]
-        
-        influenced_users = set()
-        for rec in recsys_agents:
-            influenced_users.update(rec.user_profiles.keys())
-        
+        human_agents = self.human_agents
+
         # Get only human agents that have been influenced
-        influenced_humans = [agent_id for agent_id in influenced_users 
-                            if any(a.unique_id == agent_id and a.type == 0 for a in self.agent_list)]
+        influenced_humans = np.count_nonzero(self.recsys_profiled & (self.types == 0))
         
         # Calculate percentage of influenced humans
-        return len(influenced_humans) / len(human_agents) if len(human_agents) > 0 else 0
+        return influenced_humans / len(human_agents) if len(human_agents) > 0 else 0
     
 
 
+    def _neighborhood(self, radius):
+        """Flat cell indices of every cell's Moore neighborhood, in the grid's order"""
+        neighborhoods = self._neighborhoods.get(radius)
+        if neighborhoods is None:
+            neighborhoods = [
+                np.array([nx * self.height + ny for nx, ny in
+                          self.grid.get_neighborhood(pos, moore=True, radius=radius)],
+                         dtype=np.intp)
+                for _, pos in self.grid.coord_iter()
+            ]
+            self._neighborhoods[radius] = neighborhoods
+        return neighborhoods
+
+    def neighbor_ids(self, pos, radius):
+        """unique_ids of the agents around pos, in the same order as grid.get_neighbors"""
+        ids = self.cell_ids[self._neighborhood(radius)[pos[0] * self.height + pos[1]]]
+        return ids[ids != 0]
+
+    def move_to_empty(self, agent):
+        """Move an agent to a random empty cell, keeping cell_ids in sync with the grid"""
+        x, y = agent.pos
+        self.grid.move_to_empty(agent)
+        self.cell_ids[x * self.height + y] = 0
+        x, y = agent.pos
+        self.cell_ids[x * self.height + y] = agent.unique_id
+
     def step(self):
         """Run one step of the model."""
         self.happy = 0
         self.agents.shuffle_do("step")
-        self.datacollector.collect(self)
         self.step_count += 1
 
         # Calculate current happy ratio
-        happy_ratio = self.happy / len(self.agent_list) if self.agent_list else 0
+        happy_ratio = self.happy / self.n_agents if self.n_agents else 0
 
         # Check for stability (plateau)
         if self.prev_happy_ratio is not None:
@@ -222,4 +368,9 @@ class EchoChamber(Model):
         self.prev_happy_ratio = happy_ratio
 
         # Stop condition: sustained happiness plateau
-        self.running = self.happy_plateau_counter < self.plateau_required_steps
\ No newline at end of file
+        self.running = self.happy_plateau_counter < self.plateau_required_steps
+
+        if self.step_count % self.collect_every == 0:
+            self._collect()
+        if not self.running:
+            self.collect_final_state()
\ No newline at end of file
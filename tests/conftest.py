@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The model modules import each other by bare name (as when run from src/echochamber)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "echochamber"))
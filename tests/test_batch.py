@@ -0,0 +1,8 @@
+from batch import run_batch
+
+
+def test_step_capped_run_ends_with_final_state():
+    # 10x10 with seed 2 is still running at step 20, so the cap ends the run
+    (results,) = run_batch(
+        [{"seed": 2, "width": 10, "height": 10, "collect_every": 3}], max_steps=20, n_workers=1)
+    assert results["Step"].tolist() == [0, 3, 6, 9, 12, 15, 18, 20]
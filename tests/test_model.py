@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+
+from model import EchoChamber
+
+
+def _snapshot(model):
+    return model.datacollector.get_model_vars_dataframe()
+
+
+def test_string_seed():
+    # The app's seed field is an InputText, which returns a str once edited
+    model = EchoChamber(width=10, height=10, seed="42")
+    model.step()
+    assert model.n_agents > 0
+
+
+def test_same_seed_reproduces_run():
+    a = EchoChamber(width=10, height=10, seed=42)
+    b = EchoChamber(width=10, height=10, seed=42)
+    for _ in range(5):
+        a.step()
+        b.step()
+    assert _snapshot(a).equals(_snapshot(b))
+
+
+def _run_until_forced_stop(model, steps):
+    """Step a model that never plateaus, then force it to stop on step `steps`."""
+    model.plateau_required_steps = steps + 1
+    for _ in range(steps - 1):
+        model.step()
+    model.plateau_required_steps = 0
+    model.step()
+    assert not model.running
+
+
+def test_collect_every_rows_are_labelled_by_step():
+    sparse = EchoChamber(width=10, height=10, seed=5, collect_every=4)
+    dense = EchoChamber(width=10, height=10, seed=5)
+    _run_until_forced_stop(sparse, 7)
+    _run_until_forced_stop(dense, 7)
+
+    # Steps 0 and 4 are on cadence; step 7 is collected because the model stopped
+    rows = _snapshot(sparse)
+    assert rows["Step"].tolist() == [0, 4, 7]
+
+    # Each collected row matches the every-step run at the same step
+    expected = _snapshot(dense).set_index("Step").loc[rows["Step"]]
+    assert rows.set_index("Step").equals(expected)
+
+
+def test_collect_final_state_only_adds_missing_rows():
+    model = EchoChamber(width=10, height=10, seed=5, collect_every=3)
+    model.plateau_required_steps = 100
+    for _ in range(5):
+        model.step()
+    model.collect_final_state()
+    model.collect_final_state()
+    assert _snapshot(model)["Step"].tolist() == [0, 3, 5]
+
+    model.step()  # step 6 is on cadence, so there is nothing left to add
+    model.collect_final_state()
+    assert _snapshot(model)["Step"].tolist() == [0, 3, 5, 6]
+
+
+@pytest.mark.parametrize("radius", [1, 2])
+def test_neighbor_ids_match_grid_order(radius):
+    # Scoring and update_connections rely on cell_ids tracking every move and
+    # on neighbors coming back in grid.get_neighbors order
+    model = EchoChamber(width=7, height=7, radius=radius, seed=3)
+    for _ in range(3):
+        model.step()
+    for agent in model.agent_list:
+        expected = [n.unique_id for n in
+                    model.grid.get_neighbors(agent.pos, moore=True, radius=radius)]
+        assert model.neighbor_ids(agent.pos, radius).tolist() == expected
+
+
+def test_agent_snapshot_matches_agent_reporters():
+    model = EchoChamber(width=10, height=10, seed=42, collect_agents=True)
+    for _ in range(5):
+        model.step()
+    collected = model.datacollector.get_agent_vars_dataframe()
+    last_step = collected.index.get_level_values("Step").max()
+    pd.testing.assert_frame_equal(
+        model.agent_snapshot(), collected.xs(last_step, level="Step"), check_dtype=False)